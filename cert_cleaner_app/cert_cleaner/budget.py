@@ -0,0 +1,57 @@
+# Machine-wide memory budget for OCR rasterisation
+import math
+import time
+from .lease import LeaseManager
+
+BUDGET_POLL_INTERVAL = 0.5
+
+
+class MemoryBudget:
+    """
+    Machine-wide memory budget shared by every process on this PC.
+
+    The budget is split into slots of slot_bytes, each one a lease in slot_folder
+    (a local temp folder, since memory is per machine). A job takes as many slots
+    as its estimated cost needs, all or nothing, and waits until they are free.
+    Slots held by a crashed process expire like any other lease.
+    """
+    def __init__(self, limit, slot_bytes, slot_folder, poll=BUDGET_POLL_INTERVAL):
+        self.slot_bytes = slot_bytes
+        self.slots = max(1, limit // slot_bytes)
+        self.slot_folder = slot_folder
+        self.poll = poll
+        self._leases = None
+
+    def _manager(self):
+        if self._leases is None:
+            self._leases = LeaseManager(self.slot_folder)
+        return self._leases
+
+    def _try_acquire(self, count):
+        leases = self._manager()
+        keys = []
+        for i in range(self.slots):
+            if len(keys) == count:
+                break
+            if leases.claim(f"slot-{i}"):
+                keys.append(f"slot-{i}")
+        if len(keys) < count:
+            self.release(keys)
+            return None
+        return keys
+
+    def acquire(self, cost):
+        """
+        Blocks until slots covering cost bytes are held and returns their keys.
+        A cost larger than the whole budget is clamped so it can still run alone.
+        """
+        count = min(max(1, math.ceil(cost / self.slot_bytes)), self.slots)
+        while True:
+            keys = self._try_acquire(count)
+            if keys is not None:
+                return keys
+            time.sleep(self.poll)
+
+    def release(self, keys):
+        for key in keys:
+            self._leases.release(key)
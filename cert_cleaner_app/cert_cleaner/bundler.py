@@ -0,0 +1,194 @@
+# Script 5: Print Bundling
+import json
+import os
+import re
+from pypdf import PdfReader, PdfWriter
+
+MANIFEST_NAME = "bundles.json"
+BUNDLE_RE = re.compile(r'^bundle_(\d+)\.pdf$')
+
+
+def parse_bundle_name(filename, tlma=None):
+    """
+    Returns (district, upin) for a verified PDF, or None if no UPIN is found.
+    The district is any TLMA code in front of the UPIN ("tlma-12345.pdf");
+    files without one, such as the merger's "12345.pdf", use the tlma argument.
+    """
+    match = re.match(r'^(.*?)[\s_\-]*(\d{4,})\.pdf$', filename, re.IGNORECASE)
+    if not match:
+        return None
+    district = match.group(1).strip().lower() or (tlma or "").strip().lower()
+    return district, match.group(2)
+
+
+def sort_key(filename, order="upin", tlma=None):
+    district, upin = parse_bundle_name(filename, tlma)
+    if order == "district":
+        return (district, int(upin), filename)
+    return (int(upin), district, filename)
+
+
+def load_manifest(output_folder):
+    path = os.path.join(output_folder, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"bundles": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(output_folder, manifest):
+    path = os.path.join(output_folder, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def next_bundle_number(output_folder, manifest):
+    numbers = [0]
+    for bundle in manifest["bundles"]:
+        match = BUNDLE_RE.match(bundle["name"])
+        if match:
+            numbers.append(int(match.group(1)))
+    for f in os.listdir(output_folder):
+        match = BUNDLE_RE.match(f)
+        if match:
+            numbers.append(int(match.group(1)))
+    return max(numbers) + 1
+
+
+def write_bundle(bundle_path, entries, order="upin"):
+    """
+    Writes one bundle from (filename, path, upin, district) entries, adding a
+    bookmark per UPIN (grouped under a district bookmark in district order).
+    The bundle is written to a temporary file first so an interrupted run
+    never leaves a half-written bundle behind.
+    """
+    writer = PdfWriter()
+    district_items = {}
+
+    for filename, path, upin, district in entries:
+        first_page = len(writer.pages)
+        reader = PdfReader(path)
+        for page in reader.pages:
+            writer.add_page(page)
+
+        parent = None
+        if order == "district":
+            if district not in district_items:
+                district_items[district] = writer.add_outline_item(
+                    district.upper() or "(no district)", first_page
+                )
+            parent = district_items[district]
+        writer.add_outline_item(upin, first_page, parent=parent)
+
+    tmp_path = bundle_path + ".part"
+    with open(tmp_path, "wb") as out_file:
+        writer.write(out_file)
+    os.replace(tmp_path, bundle_path)
+
+
+def main(cert_folder, titleplan_folder, output_folder, tlma=None, ta=None, dry_run=False, log_callback=None,
+         order="upin", max_pages=500, max_bytes=None):
+    """
+    Streams verified PDFs from cert_folder into large print bundles in output_folder.
+    Bundles are capped by max_pages and/or max_bytes (approximated from source file sizes).
+    Files already recorded in the bundle manifest are skipped, so re-running after
+    more files are verified only appends new bundles and never rewrites existing ones.
+    """
+    def log(msg):
+        if log_callback:
+            log_callback(msg)
+        else:
+            print(msg)
+
+    if order not in ("upin", "district"):
+        raise ValueError(f"Unknown bundle order: {order}")
+    if os.path.abspath(output_folder) == os.path.abspath(cert_folder):
+        raise ValueError("Bundle output folder must be different from the verified folder.")
+
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = load_manifest(output_folder)
+    already_bundled = {f for bundle in manifest["bundles"] for f in bundle["files"]}
+
+    files = []
+    skipped = []
+    for f in os.listdir(cert_folder):
+        if not f.lower().endswith('.pdf'):
+            continue
+        if f in already_bundled or BUNDLE_RE.match(f):
+            # Never feed earlier bundles back in as UPIN files
+            continue
+        if not parse_bundle_name(f, tlma):
+            skipped.append(f)
+            continue
+        files.append(f)
+    files.sort(key=lambda f: sort_key(f, order, tlma))
+
+    log(f"Found {len(files)} new verified PDF(s) to bundle ({len(already_bundled)} already bundled).")
+
+    bundle_number = next_bundle_number(output_folder, manifest)
+    bundle_count = 0
+    bundled_files = 0
+    unreadable = []
+    current = []
+    current_pages = 0
+    current_bytes = 0
+
+    def flush():
+        nonlocal bundle_number, bundle_count, bundled_files, current, current_pages, current_bytes
+        if not current:
+            return
+        name = f"bundle_{bundle_number:04d}.pdf"
+        log(f"Bundle {name}: {len(current)} file(s), {current_pages} page(s), "
+            f"UPIN {current[0][2]} - {current[-1][2]}")
+        if not dry_run:
+            write_bundle(os.path.join(output_folder, name), current, order)
+            manifest["bundles"].append({
+                "name": name,
+                "pages": current_pages,
+                "files": [entry[0] for entry in current],
+            })
+            save_manifest(output_folder, manifest)
+            log(f"Saved: {name}")
+        bundle_number += 1
+        bundle_count += 1
+        bundled_files += len(current)
+        current = []
+        current_pages = 0
+        current_bytes = 0
+
+    for f in files:
+        path = os.path.join(cert_folder, f)
+        try:
+            pages = len(PdfReader(path).pages)
+            size = os.path.getsize(path)
+        except Exception as e:
+            log(f"Unreadable: {f} ({e})")
+            unreadable.append(f)
+            continue
+
+        over_pages = max_pages and current_pages + pages > max_pages
+        over_bytes = max_bytes and current_bytes + size > max_bytes
+        if current and (over_pages or over_bytes):
+            flush()
+
+        district, upin = parse_bundle_name(f, tlma)
+        current.append((f, path, upin, district))
+        current_pages += pages
+        current_bytes += size
+
+    flush()
+
+    # Summary
+    log(f"\nBundles created: {bundle_count} ({bundled_files} files)")
+    if dry_run:
+        log("Dry run – no bundles written")
+    if skipped:
+        log(f"Skipped (no UPIN found): {len(skipped)}")
+        for f in skipped:
+            log(f" - {f}")
+    if unreadable:
+        log(f"Unreadable: {len(unreadable)}")
+        for f in unreadable:
+            log(f" - {f}")
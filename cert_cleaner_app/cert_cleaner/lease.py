@@ -0,0 +1,232 @@
+# Shared-folder lease queue for multi-workstation runs
+import os
+import socket
+import threading
+import time
+import uuid
+
+LEASE_TTL = 120        # seconds a lease must go without a heartbeat before it is considered abandoned
+HEARTBEAT_INTERVAL = 30
+CLAIM_POLL_INTERVAL = 5  # seconds between retries of items leased by another node
+
+
+def fingerprint(*paths):
+    """Size and mtime of each file; changes whenever an operator replaces a file."""
+    parts = []
+    for path in paths:
+        st = os.stat(path)
+        parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
+
+
+class LeaseManager:
+    """
+    Claims work items through lock files in a lease folder on the shared drive.
+
+    A lease is "<key>.lease", created with O_CREAT | O_EXCL so only one machine can
+    hold it. A background thread refreshes the mtime of every held lease; a lease
+    whose mtime and owner have not changed for ttl seconds belongs to a crashed
+    node and may be broken. Staleness is timed with this node's monotonic clock
+    rather than by comparing mtimes to time.time(), so clock skew between
+    workstations and the file server cannot make a live lease look expired.
+    Breaking is serialised through a "<key>.break" lock so two nodes can never
+    both take over the same expired lease.
+
+    Outcomes that would repeat exactly on every node (e.g. a UPIN mismatch) are
+    recorded in "<key>.marker" with a fingerprint of the files, so other nodes
+    skip them until an operator replaces the files or deletes the marker.
+    Errors that may be transient (unreadable files, share hiccups, missing OCR
+    tools) are never recorded and are simply retried.
+    """
+    def __init__(self, lease_folder, ttl=LEASE_TTL, heartbeat=HEARTBEAT_INTERVAL, owner=None):
+        self.lease_folder = lease_folder
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.held = set()
+        self._seen = {}  # path -> ((mtime, owner), monotonic time first seen)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        os.makedirs(lease_folder, exist_ok=True)
+        self._thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _path(self, key):
+        return os.path.join(self.lease_folder, f"{key}.lease")
+
+    def _read_owner(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _is_expired(self, path):
+        """
+        True once path has gone ttl seconds (on this node's clock) without its
+        mtime or owner changing. The first sighting of a lease never counts as
+        expired, so a node must watch a lease for ttl before breaking it.
+        """
+        try:
+            state = (os.path.getmtime(path), self._read_owner(path))
+        except FileNotFoundError:
+            self._seen.pop(path, None)
+            return True
+        now = time.monotonic()
+        seen = self._seen.get(path)
+        if seen is None or seen[0] != state:
+            self._seen[path] = (state, now)
+            return False
+        return now - seen[1] > self.ttl
+
+    def _create(self, path):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.owner)
+        return True
+
+    def _break_expired(self, key):
+        """Removes an expired lease for key. Returns True if the lease is gone."""
+        path = self._path(key)
+        if not self._is_expired(path):
+            return False
+
+        break_path = os.path.join(self.lease_folder, f"{key}.break")
+        if not self._create(break_path):
+            # Another node is breaking it; clear the break lock only if that node died too
+            if self._is_expired(break_path):
+                try:
+                    os.remove(break_path)
+                except OSError:
+                    pass
+                self._seen.pop(break_path, None)
+            return False
+        try:
+            # Re-check under the break lock: the lease may have been renewed or re-claimed
+            if not self._is_expired(path):
+                return False
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._seen.pop(path, None)
+            return True
+        finally:
+            try:
+                os.remove(break_path)
+            except OSError:
+                pass
+
+    def claim(self, key):
+        """Tries to take the lease for key. Returns True if this node now holds it."""
+        path = self._path(key)
+        if self._create(path) or (self._break_expired(key) and self._create(path)):
+            with self._lock:
+                self.held.add(key)
+            return True
+        return False
+
+    def holds(self, key):
+        """True if this node still holds key; its lease may have been broken while this node stalled."""
+        with self._lock:
+            if key not in self.held:
+                return False
+        return self._read_owner(self._path(key)) == self.owner
+
+    def release(self, key):
+        with self._lock:
+            self.held.discard(key)
+        path = self._path(key)
+        if self._read_owner(path) == self.owner:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _marker_path(self, key):
+        return os.path.join(self.lease_folder, f"{key}.marker")
+
+    def mark(self, key, status, source_fingerprint):
+        """
+        Records a deterministic outcome for this version of key's files, then
+        releases the lease. Only use it for results every node would reach.
+        """
+        path = self._marker_path(key)
+        tmp_path = f"{path}.{self.owner}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f"{status}\n{source_fingerprint}")
+        os.replace(tmp_path, path)
+        self.release(key)
+
+    def marked(self, key, source_fingerprint):
+        """Returns the status recorded for key if its files are unchanged, else None."""
+        content = self._read_owner(self._marker_path(key))
+        if not content or "\n" not in content:
+            return None
+        status, recorded = content.split("\n", 1)
+        return status if recorded == source_fingerprint else None
+
+    def claim_all(self, keys, is_pending, poll=CLAIM_POLL_INTERVAL, log=None):
+        """
+        Yields each key once this node holds its lease; the caller must then
+        release or mark it. Keys leased by another node are retried every
+        poll seconds until this node claims them (e.g. after that node crashed)
+        or is_pending(key) reports that they no longer need doing.
+        """
+        waiting = list(keys)
+        reported = None
+        while waiting:
+            busy = []
+            for key in waiting:
+                if not is_pending(key):
+                    continue
+                if not self.claim(key):
+                    busy.append(key)
+                    continue
+                # Another node may have finished it between the check and the claim
+                if not is_pending(key):
+                    self.release(key)
+                    continue
+                yield key
+            if busy and log and len(busy) != reported:
+                log(f"Waiting for {len(busy)} item(s) leased by other workstations...")
+                reported = len(busy)
+            waiting = busy
+            if waiting:
+                time.sleep(poll)
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat):
+            with self._lock:
+                keys = list(self.held)
+            for key in keys:
+                path = self._path(key)
+                if self._read_owner(path) != self.owner:
+                    # Lease was broken by another node; stop renewing it
+                    with self._lock:
+                        self.held.discard(key)
+                    continue
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+
+    def close(self):
+        """Stops the heartbeat and releases every lease still held."""
+        self._stop.set()
+        self._thread.join()
+        with self._lock:
+            keys = list(self.held)
+        for key in keys:
+            self.release(key)
+
@@ -2,8 +2,9 @@
 import os
 import re
 from pypdf import PdfReader, PdfWriter
+from .lease import LeaseManager, fingerprint
 
-def main(cert_folder, titleplan_folder, output_folder, tlma=None, ta=None, dry_run=False, log_callback=None):
+def main(cert_folder, titleplan_folder, output_folder, tlma=None, ta=None, dry_run=False, log_callback=None, lease_folder=None):
     def log(msg):
         if log_callback:
             log_callback(msg)
@@ -22,6 +23,10 @@ def main(cert_folder, titleplan_folder, output_folder, tlma=None, ta=None, dry_r
     os.makedirs(output_folder, exist_ok=True)
     merged_count = 0
     skipped = []
+    undeleted = []
+    undeleted_before = []
+    pairs = {}
+    duplicates = {}
 
     # Match certs by extracting UPIN from the end of the filename
     for f in os.listdir(cert_folder):
@@ -29,45 +34,115 @@ def main(cert_folder, titleplan_folder, output_folder, tlma=None, ta=None, dry_r
             match = re.search(r'(\d{4,})\.pdf$', f)
             if match:
                 upin = match.group(1)
-                cert_path = os.path.join(cert_folder, f)
                 title_path = titleplans.get(upin)
 
                 if title_path:
-                    output_path = os.path.join(output_folder, f"{upin}.pdf")
-                    log(f"Merging: {f} + {os.path.basename(title_path)} -> {upin}.pdf")
-
-                    if not dry_run:
-                        try:
-                            # Merge PDFs
-                            writer = PdfWriter()
-                            for path in [cert_path, title_path]:
-                                reader = PdfReader(path)
-                                for page in reader.pages:
-                                    writer.add_page(page)
-                            with open(output_path, "wb") as out_file:
-                                writer.write(out_file)
-                            log(f"Saved: {output_path}")
-                            merged_count += 1
-
-                            # Delete source files after successful merge
-                            try:
-                                os.remove(cert_path)
-                                os.remove(title_path)
-                                log(f"Deleted source files: {f}, {os.path.basename(title_path)}")
-                            except Exception as e:
-                                log(f"Error deleting source files for {upin}: {e}")
-
-                        except Exception as e:
-                            log(f"Error merging {upin}: {e}")
+                    # Several certs for one UPIN: merge none of them rather than guess
+                    if upin in duplicates:
+                        duplicates[upin].append(f)
+                    elif upin in pairs:
+                        duplicates[upin] = [pairs.pop(upin)[0], f]
                     else:
-                        log("Dry run – skipping actual merge and deletion")
+                        pairs[upin] = (f, os.path.join(cert_folder, f), title_path)
                 else:
                     skipped.append(f)
             else:
                 log(f"Skipped (no UPIN found): {f}")
 
+    def merge_pair(upin, leases=None, key=None):
+        """
+        Merges one pair. Returns "merged", "undeleted" (merged, but the sources
+        could not be deleted), "lost" (lease taken over, sources left for the new
+        holder) or "error" (nothing merged, sources left in place).
+        """
+        nonlocal merged_count
+        f, cert_path, title_path = pairs[upin]
+
+        output_path = os.path.join(output_folder, f"{upin}.pdf")
+        log(f"Merging: {f} + {os.path.basename(title_path)} -> {upin}.pdf")
+
+        if dry_run:
+            log("Dry run – skipping actual merge and deletion")
+            return "merged"
+
+        # Write under a temporary name so other workstations never see a partial PDF;
+        # the owner keeps two nodes from sharing it if a stalled lease was broken
+        tmp_path = f"{output_path}.{leases.owner}.part" if leases else output_path + ".part"
+        try:
+            # Merge PDFs
+            writer = PdfWriter()
+            for path in [cert_path, title_path]:
+                reader = PdfReader(path)
+                for page in reader.pages:
+                    writer.add_page(page)
+            with open(tmp_path, "wb") as out_file:
+                writer.write(out_file)
+            os.replace(tmp_path, output_path)
+            log(f"Saved: {output_path}")
+            merged_count += 1
+        except Exception as e:
+            log(f"Error merging {upin}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return "error"
+
+        if leases and not leases.holds(key):
+            log(f"Lease for {upin} was taken over by another workstation; leaving source files")
+            return "lost"
+
+        # Delete source files after successful merge
+        try:
+            os.remove(cert_path)
+            os.remove(title_path)
+            log(f"Deleted source files: {f}, {os.path.basename(title_path)}")
+        except Exception as e:
+            log(f"Error deleting source files for {upin}: {e}")
+            undeleted.append(f)
+            return "undeleted"
+        return "merged"
+
+    if not lease_folder or dry_run:
+        for upin in pairs:
+            merge_pair(upin)
+    else:
+        # Multi-workstation mode: claim each pair through the shared lease folder
+        keys = {f"merge-{upin}": upin for upin in pairs}
+
+        def is_pending(key):
+            _, cert_path, title_path = pairs[keys[key]]
+            try:
+                source = fingerprint(cert_path, title_path)
+            except FileNotFoundError:
+                return False  # merged by another workstation
+            if leases.marked(key, source) == "undeleted":
+                undeleted_before.append(pairs[keys[key]][0])
+                return False
+            return True
+
+        with LeaseManager(lease_folder) as leases:
+            for key in leases.claim_all(keys, is_pending, log=log):
+                _, cert_path, title_path = pairs[keys[key]]
+                source = fingerprint(cert_path, title_path)
+                # Merge errors may be transient, so only a completed merge is recorded
+                if merge_pair(keys[key], leases, key) == "undeleted":
+                    leases.mark(key, "undeleted", source)
+                else:
+                    leases.release(key)
+
     log(f"\nMerged: {merged_count} pairs")
     if skipped:
         log(f"Skipped (no title plan match): {len(skipped)}")
         for f in skipped:
             log(f" - {f}")
+    if duplicates:
+        log(f"Skipped (more than one cert for the same UPIN): {len(duplicates)}")
+        for upin, files in sorted(duplicates.items()):
+            log(f" - {upin}: {', '.join(sorted(files))}")
+    if undeleted:
+        log(f"Merged but source files not deleted: {len(undeleted)}")
+        for f in undeleted:
+            log(f" - {f}")
+    if undeleted_before:
+        log(f"Skipped (merged earlier, source files not deleted): {len(undeleted_before)}")
+        for f in undeleted_before:
+            log(f" - {f}")
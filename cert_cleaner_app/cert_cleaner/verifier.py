@@ -1,25 +1,60 @@
 # Script 4: Verification
 import os
 import shutil
+import tempfile
 from pypdf import PdfReader
 import re
 from pdf2image import convert_from_path
 import pytesseract
+from .budget import MemoryBudget
+from .lease import LeaseManager, fingerprint
+
+OCR_DPI = 200
+# Memory (bytes) that OCR rasterisations across all processes on this PC may use at once
+OCR_MEMORY_BUDGET = 512 * 1024 * 1024
+OCR_SLOT_BYTES = 32 * 1024 * 1024
+
+ocr_budget = MemoryBudget(OCR_MEMORY_BUDGET, OCR_SLOT_BYTES,
+                          os.path.join(tempfile.gettempdir(), "cert_cleaner_ocr_slots"))
+
+
+def estimate_raster_bytes(pdf_path, page_index, dpi=OCR_DPI):
+    """Estimated RGB raster size of a page at the given DPI."""
+    try:
+        box = PdfReader(pdf_path).pages[page_index].mediabox
+        width = float(box.width) / 72 * dpi
+        height = float(box.height) / 72 * dpi
+    except Exception:
+        # Unknown size: assume A3 so large-format plans are not under-counted
+        width, height = 11.7 * dpi, 16.5 * dpi
+    return int(width * height * 3)
+
 
 # UPIN extraction functions
 def extract_upin_titleplan_ocr(pdf_path, cert_upin=None):
     """
     Fallback OCR extraction for title plan UPIN.
     Only used if normal extraction fails.
+    The page is rasterised to a temporary directory and tesseract reads it from
+    disk, so no page images are held in memory; rasterisations running at the
+    same time in any process on this PC are throttled by ocr_budget.
     """
     try:
-        # Convert the second page (index 1) to an image
-        images = convert_from_path(pdf_path, first_page=2, last_page=2)  # page_index=1
-        if not images:
-            return None
+        slots = ocr_budget.acquire(estimate_raster_bytes(pdf_path, 1))
+        try:
+            with tempfile.TemporaryDirectory(prefix="cert_ocr_") as tmp_dir:
+                # Convert the second page (index 1) to an image file
+                image_paths = convert_from_path(
+                    pdf_path, dpi=OCR_DPI, first_page=2, last_page=2,  # page_index=1
+                    output_folder=tmp_dir, fmt="png", paths_only=True
+                )
+                if not image_paths:
+                    return None
+
+                text = pytesseract.image_to_string(image_paths[0])
+        finally:
+            ocr_budget.release(slots)
 
-        image = images[0]
-        text = pytesseract.image_to_string(image)
         text_clean = re.sub(r'\s+', ' ', text)  # normalize whitespace
 
         # Try matching UPIN using existing regex logic
@@ -102,7 +137,8 @@ def extract_upin(pdf_path, page_index, cert_upin=None):
     except Exception:
         return None
 
-def main(cert_folder, titleplan_folder, output_folder, tlma=None, ta=None, dry_run=False, log_callback=None):
+def main(cert_folder, titleplan_folder, output_folder, tlma=None, ta=None, dry_run=False, log_callback=None,
+         lease_folder=None):
     """
     Verifies merged PDFs: certificate UPIN matches title plan UPIN.
     Copies verified PDFs to output_folder and deletes them from source.
@@ -118,10 +154,13 @@ def main(cert_folder, titleplan_folder, output_folder, tlma=None, ta=None, dry_r
     verified_count = 0
     mismatched = []
     unreadable = []
+    mismatched_before = []
 
     os.makedirs(output_folder, exist_ok=True)
 
-    for f in files:
+    def verify_file(f, leases=None, key=None):
+        """Verifies one merged PDF. Returns "verified", "unreadable", "mismatch" or "error"."""
+        nonlocal verified_count
         merged_path = os.path.join(cert_folder, f)
 
         upin_cert = extract_upin(merged_path, 0)
@@ -143,22 +182,69 @@ def main(cert_folder, titleplan_folder, output_folder, tlma=None, ta=None, dry_r
                     log(f"--- Extracted text from {f}, page {i} ---\n{text[:500]}...\n--- End ---")
             except Exception as e:
                 log(f"Error reading PDF for debug dump: {e}")
-            continue
+            return "unreadable"
 
         if upin_cert == upin_title:
             log(f"Verified: {f} (UPIN {upin_cert})")
             dest_path = os.path.join(output_folder, f)
             if not dry_run:
-                shutil.copy2(merged_path, dest_path)
+                # Copy under a temporary name so a concurrent bundler never reads a partial PDF;
+                # the owner keeps two nodes from sharing it if a stalled lease was broken
+                tmp_path = f"{dest_path}.{leases.owner}.part" if leases else dest_path + ".part"
+                try:
+                    shutil.copy2(merged_path, tmp_path)
+                    os.replace(tmp_path, dest_path)
+                except FileNotFoundError:
+                    log(f"Skipped (already moved by another workstation): {f}")
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    return "verified"
+                except OSError as e:
+                    log(f"Error copying {f}: {e}")
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    return "error"
+                if leases and not leases.holds(key):
+                    log(f"Lease for {f} was taken over by another workstation; leaving source file")
+                    return "verified"
                 try:
                     os.remove(merged_path)
                     log(f"Deleted source file: {f}")
                 except Exception as e:
                     log(f"Error deleting {f}: {e}")
             verified_count += 1
-        else:
-            log(f"Mismatch: {f} (Cert UPIN: {upin_cert}, Title UPIN: {upin_title})")
-            mismatched.append(f)
+            return "verified"
+
+        log(f"Mismatch: {f} (Cert UPIN: {upin_cert}, Title UPIN: {upin_title})")
+        mismatched.append(f)
+        return "mismatch"
+
+    if not lease_folder or dry_run:
+        for f in files:
+            verify_file(f)
+    else:
+        # Multi-workstation mode: claim each file through the shared lease folder
+        keys = {f"verify-{f}": f for f in files}
+
+        def is_pending(key):
+            try:
+                source = fingerprint(os.path.join(cert_folder, keys[key]))
+            except FileNotFoundError:
+                return False  # verified by another workstation
+            if leases.marked(key, source) == "mismatch":
+                mismatched_before.append(keys[key])
+                return False
+            return True
+
+        with LeaseManager(lease_folder) as leases:
+            for key in leases.claim_all(keys, is_pending, log=log):
+                source = fingerprint(os.path.join(cert_folder, keys[key]))
+                # Unreadable files may be a missing OCR tool or share hiccup, so only
+                # a mismatch (both UPINs read) is recorded for other workstations
+                if verify_file(keys[key], leases, key) == "mismatch":
+                    leases.mark(key, "mismatch", source)
+                else:
+                    leases.release(key)
 
     # Summary
     log(f"Verified: {verified_count} files")
@@ -170,3 +256,7 @@ def main(cert_folder, titleplan_folder, output_folder, tlma=None, ta=None, dry_r
         log(f"Unreadable: {len(unreadable)}")
         for f in unreadable:
             log(f" - {f}")
+    if mismatched_before:
+        log(f"Skipped (mismatch already recorded, file unchanged): {len(mismatched_before)}")
+        for f in mismatched_before:
+            log(f" - {f}")
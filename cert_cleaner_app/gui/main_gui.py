@@ -2,7 +2,7 @@
 # gui/main_gui.py
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext, messagebox
-from cert_cleaner import cert_cleaner, titleplan_cleaner, merger, verifier
+from cert_cleaner import cert_cleaner, titleplan_cleaner, merger, verifier, bundler
 
 class CertCleanerGUI:
     def __init__(self, root):
@@ -14,7 +14,9 @@ class CertCleanerGUI:
         self.notebook.pack(fill="both", expand=True)
 
         self.tabs = {}
-        for stage in ["Clean Certs", "Clean Title Plans", "Merge & Move", "Verify"]:
+        self.dry_run_vars = {}
+        self.log_widgets = {}
+        for stage in ["Clean Certs", "Clean Title Plans", "Merge & Move", "Verify", "Print Bundles"]:
             self.tabs[stage] = ttk.Frame(self.notebook)
             self.notebook.add(self.tabs[stage], text=stage)
 
@@ -22,6 +24,7 @@ class CertCleanerGUI:
         self.setup_titleplan_tab()
         self.setup_merge_tab()
         self.setup_verify_tab()
+        self.setup_bundle_tab()
 
     def setup_clean_certs_tab(self):
         tab = self.tabs["Clean Certs"]
@@ -43,6 +46,7 @@ class CertCleanerGUI:
         tab = self.tabs["Merge & Move"]
         self._add_folder_inputs(tab, "Cert Folder", "Title Plan Folder")
         self._add_folder_inputs(tab, "Merged Output", None)
+        self._add_folder_inputs(tab, "Merge Lease Folder (optional)", None)
         self._add_dry_run(tab)
         self._add_run_button(tab, merger.main)
         self._add_log_area(tab)
@@ -51,9 +55,23 @@ class CertCleanerGUI:
         tab = self.tabs["Verify"]
         self._add_folder_inputs(tab, "Merged Folder", None)
         self._add_folder_inputs(tab, "Ready for Print", "Review Folder")
+        self._add_folder_inputs(tab, "Verify Lease Folder (optional)", None)
+        self._add_dry_run(tab)
         self._add_run_button(tab, verifier.main)
         self._add_log_area(tab)
 
+    def setup_bundle_tab(self):
+        tab = self.tabs["Print Bundles"]
+        self._add_folder_inputs(tab, "Verified Folder", "Bundle Output")
+        self._add_choice(tab, "Bundle Order", ["upin", "district"])
+        self._add_entry(tab, "Bundle TLMA Code (optional)")
+        self._add_entry(tab, "Max Pages per Bundle")
+        self.max_pages_per_bundle.insert(0, "500")
+        self._add_entry(tab, "Max MB per Bundle (optional)")
+        self._add_dry_run(tab)
+        self._add_run_button(tab, bundler.main)
+        self._add_log_area(tab)
+
     # Reusable GUI components
     def _add_folder_inputs(self, parent, label1, label2):
         for label in [label1, label2] if label2 else [label1]:
@@ -67,12 +85,19 @@ class CertCleanerGUI:
 
 
 
-    def _write_log(self, message):
-            if hasattr(self, "log_widget"):
-                self.log_widget.configure(state="normal")
-                self.log_widget.insert(tk.END, message + "\n")
-                self.log_widget.see(tk.END)
-                self.log_widget.configure(state="disabled")
+    def _tab_name(self, parent):
+        return next(name for name, tab in self.tabs.items() if tab is parent)
+
+    def _write_log(self, message, tab_name=None):
+            # Stages run synchronously, so logs go to the tab that started the run
+            if tab_name is None:
+                tab_name = self.notebook.tab(self.notebook.select(), "text")
+            log_widget = self.log_widgets.get(tab_name)
+            if log_widget:
+                log_widget.configure(state="normal")
+                log_widget.insert(tk.END, message + "\n")
+                log_widget.see(tk.END)
+                log_widget.configure(state="disabled")
 
     def _add_entry(self, parent, label):
         row = ttk.Frame(parent)
@@ -82,20 +107,32 @@ class CertCleanerGUI:
         entry.pack(side="left", padx=5)
         setattr(self, self._field_name(label), entry)
 
+    def _add_choice(self, parent, label, values):
+        row = ttk.Frame(parent)
+        row.pack(fill="x", pady=5)
+        ttk.Label(row, text=label + ":").pack(side="left")
+        combo = ttk.Combobox(row, values=values, state="readonly", width=20)
+        combo.set(values[0])
+        combo.pack(side="left", padx=5)
+        setattr(self, self._field_name(label), combo)
+
     def _field_name(self, label):
         return label.lower().replace(" ", "_").replace("(", "").replace(")", "").replace("-", "").replace("__", "_")
 
     def _add_dry_run(self, parent):
-        self.dry_run_var = tk.BooleanVar()
-        ttk.Checkbutton(parent, text="Dry Run", variable=self.dry_run_var).pack(anchor="w", padx=10)
+        dry_run_var = tk.BooleanVar()
+        self.dry_run_vars[self._tab_name(parent)] = dry_run_var
+        ttk.Checkbutton(parent, text="Dry Run", variable=dry_run_var).pack(anchor="w", padx=10)
 
     def _add_run_button(self, parent, callback):
         ttk.Button(parent, text="Run", command=lambda: self._run_stage(callback)).pack(pady=10)
 
     def _add_log_area(self, parent):
-        self.log_widget = scrolledtext.ScrolledText(parent, height=10, state="disabled")
-        self.log_widget.pack(fill="both", expand=True, padx=10, pady=10)
-        self._write_log("Logs will appear here...\n")
+        tab_name = self._tab_name(parent)
+        log_widget = scrolledtext.ScrolledText(parent, height=10, state="disabled")
+        log_widget.pack(fill="both", expand=True, padx=10, pady=10)
+        self.log_widgets[tab_name] = log_widget
+        self._write_log("Logs will appear here...\n", tab_name)
 
     
     def _browse_folder(self, entry_widget):
@@ -124,11 +161,13 @@ class CertCleanerGUI:
                 cert_folder = self.cert_folder.get()
                 titleplan_folder = self.title_plan_folder.get()
                 output_folder = self.merged_output.get()
+                lease_folder = self.merge_lease_folder_optional.get() or None
                 tlma = None
                 ta = None
 
-                dry_run = self.dry_run_var.get()
-                callback(cert_folder, titleplan_folder, output_folder, tlma, ta, dry_run, self._write_log)
+                dry_run = self.dry_run_vars[tab_text].get()
+                callback(cert_folder, titleplan_folder, output_folder, tlma, ta, dry_run, self._write_log,
+                         lease_folder=lease_folder)
                 messagebox.showinfo("Success", f"{tab_text} stage completed.")
                 return
 
@@ -136,20 +175,35 @@ class CertCleanerGUI:
                 cert_folder = self.merged_folder.get()         # merged PDFs
                 titleplan_folder = None                         # not needed
                 output_folder = self.ready_for_print.get()     # verified files go here
+                lease_folder = self.verify_lease_folder_optional.get() or None
                 tlma = None
                 ta = None
 
-                dry_run = self.dry_run_var.get()
-                callback(cert_folder, titleplan_folder, output_folder, tlma, ta, dry_run, self._write_log)
+                dry_run = self.dry_run_vars[tab_text].get()
+                callback(cert_folder, titleplan_folder, output_folder, tlma, ta, dry_run, self._write_log,
+                         lease_folder=lease_folder)
                 messagebox.showinfo("Success", f"{tab_text} stage completed.")
                 return
 
-
+            elif tab_text == "Print Bundles":
+                cert_folder = self.verified_folder.get()       # verified PDFs
+                output_folder = self.bundle_output.get()
+                order = self.bundle_order.get()
+                tlma = self.bundle_tlma_code_optional.get() or None
+                max_pages = int(self.max_pages_per_bundle.get() or 0)
+                max_mb = self.max_mb_per_bundle_optional.get()
+                max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else None
+
+                dry_run = self.dry_run_vars[tab_text].get()
+                callback(cert_folder, None, output_folder, tlma, None, dry_run, self._write_log,
+                         order=order, max_pages=max_pages, max_bytes=max_bytes)
+                messagebox.showinfo("Success", f"{tab_text} stage completed.")
+                return
 
             else:
                 raise ValueError("Unknown tab selected.")
 
-            dry_run = self.dry_run_var.get()
+            dry_run = self.dry_run_vars[tab_text].get()
 
             callback(in_folder, out_folder, tlma, ta, dry_run, self._write_log)
             messagebox.showinfo("Success", f"{tab_text} stage completed.")
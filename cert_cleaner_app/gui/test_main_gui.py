@@ -20,7 +20,7 @@ class TestCertCleanerGUI(unittest.TestCase):
         self.app.cert_output.get = Mock(return_value='/output')
         self.app.tlma_code.get = Mock(return_value='TLMA1')
         self.app.ta_code_optional.get = Mock(return_value='TA1')
-        self.app.dry_run_var.get = Mock(return_value=False)
+        self.app.dry_run_vars['Clean Certs'].get = Mock(return_value=False)
 
         # Execute
         self.app._run_stage(self.callback)
@@ -38,7 +38,7 @@ class TestCertCleanerGUI(unittest.TestCase):
         self.app.notebook.tab = Mock(return_value='Clean Title Plans')
         self.app.title_plan_input.get = Mock(return_value='/input')
         self.app.title_plan_output.get = Mock(return_value='/output')
-        self.app.dry_run_var.get = Mock(return_value=False)
+        self.app.dry_run_vars['Clean Title Plans'].get = Mock(return_value=False)
 
         # Execute
         self.app._run_stage(self.callback)
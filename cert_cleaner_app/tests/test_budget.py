@@ -0,0 +1,65 @@
+# Tests for budget
+import multiprocessing
+import tempfile
+import time
+import unittest
+from cert_cleaner.budget import MemoryBudget
+
+
+def rasterise(slot_folder, running, peak, lock):
+    budget = MemoryBudget(2 * 100, 100, slot_folder, poll=0.02)
+    slots = budget.acquire(100)
+    try:
+        with lock:
+            running.value += 1
+            peak.value = max(peak.value, running.value)
+        time.sleep(0.1)
+        with lock:
+            running.value -= 1
+    finally:
+        budget.release(slots)
+
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_budget_is_shared_between_instances(self):
+        a = MemoryBudget(4 * 100, 100, self.folder)
+        b = MemoryBudget(4 * 100, 100, self.folder)
+
+        slots = a.acquire(300)
+        self.assertEqual(len(slots), 3)
+        self.assertIsNone(b._try_acquire(2))
+        self.assertEqual(len(b._try_acquire(1)), 1)
+
+        a.release(slots)
+        self.assertEqual(len(b._try_acquire(2)), 2)
+
+    def test_cost_over_budget_is_clamped(self):
+        budget = MemoryBudget(4 * 100, 100, self.folder)
+
+        self.assertEqual(len(budget.acquire(10_000)), 4)
+
+    def test_budget_limits_concurrency_across_processes(self):
+        running = multiprocessing.Value("i", 0)
+        peak = multiprocessing.Value("i", 0)
+        lock = multiprocessing.Lock()
+        procs = [multiprocessing.Process(target=rasterise, args=(self.folder, running, peak, lock))
+                 for _ in range(6)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        self.assertTrue(all(p.exitcode == 0 for p in procs))
+        self.assertEqual(peak.value, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+# Tests for bundler
+import json
+import os
+import tempfile
+import unittest
+from pypdf import PdfReader, PdfWriter
+from cert_cleaner import bundler
+
+
+def make_pdf(path, pages):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(100, 100)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+class TestBundler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.verified = os.path.join(self.tmp.name, "verified")
+        self.output = os.path.join(self.tmp.name, "bundles")
+        os.makedirs(self.verified)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add(self, filename, pages=2):
+        make_pdf(os.path.join(self.verified, filename), pages)
+
+    def run_bundler(self, **kwargs):
+        logs = []
+        bundler.main(self.verified, None, self.output, log_callback=logs.append, **kwargs)
+        return logs
+
+    def manifest(self):
+        with open(os.path.join(self.output, bundler.MANIFEST_NAME)) as f:
+            return json.load(f)
+
+    def test_page_cap_splits_bundles_in_upin_order(self):
+        for upin in ["30000", "10000", "20000"]:
+            self.add(f"{upin}.pdf", pages=2)
+
+        self.run_bundler(max_pages=4)
+
+        bundles = self.manifest()["bundles"]
+        self.assertEqual([b["files"] for b in bundles], [["10000.pdf", "20000.pdf"], ["30000.pdf"]])
+        reader = PdfReader(os.path.join(self.output, "bundle_0001.pdf"))
+        self.assertEqual(len(reader.pages), 4)
+        self.assertEqual([item.title for item in reader.outline], ["10000", "20000"])
+
+    def test_oversized_file_gets_its_own_bundle(self):
+        self.add("10000.pdf", pages=6)
+        self.add("20000.pdf", pages=1)
+
+        self.run_bundler(max_pages=4)
+
+        self.assertEqual([b["files"] for b in self.manifest()["bundles"]], [["10000.pdf"], ["20000.pdf"]])
+
+    def test_incremental_run_appends_without_rewriting(self):
+        self.add("10000.pdf")
+        self.add("20000.pdf")
+        self.run_bundler(max_pages=100)
+        first = os.path.join(self.output, "bundle_0001.pdf")
+        first_mtime = os.path.getmtime(first)
+
+        self.add("15000.pdf")
+        self.run_bundler(max_pages=100)
+
+        bundles = self.manifest()["bundles"]
+        self.assertEqual([b["files"] for b in bundles], [["10000.pdf", "20000.pdf"], ["15000.pdf"]])
+        self.assertEqual(os.path.getmtime(first), first_mtime)
+        self.assertEqual(len(PdfReader(first).pages), 4)
+
+        # Nothing new to bundle: no new bundle is created
+        self.run_bundler(max_pages=100)
+        self.assertEqual(len(self.manifest()["bundles"]), 2)
+
+    def test_district_order_uses_tlma_prefix(self):
+        self.add("zomba-10000.pdf")
+        self.add("blantyre-20000.pdf")
+        self.add("blantyre-15000.pdf")
+
+        self.run_bundler(order="district", max_pages=100)
+
+        bundles = self.manifest()["bundles"]
+        self.assertEqual(bundles[0]["files"], ["blantyre-15000.pdf", "blantyre-20000.pdf", "zomba-10000.pdf"])
+        reader = PdfReader(os.path.join(self.output, "bundle_0001.pdf"))
+        self.assertEqual([item.title for item in reader.outline if not isinstance(item, list)],
+                         ["BLANTYRE", "ZOMBA"])
+
+    def test_district_falls_back_to_tlma_argument(self):
+        self.assertEqual(bundler.parse_bundle_name("12345.pdf", tlma="Zomba"), ("zomba", "12345"))
+        self.assertEqual(bundler.parse_bundle_name("blantyre-12345.pdf", tlma="Zomba"), ("blantyre", "12345"))
+        self.assertIsNone(bundler.parse_bundle_name("notes.pdf"))
+
+    def test_tlma_argument_labels_merger_output(self):
+        self.add("12345.pdf")
+
+        self.run_bundler(order="district", tlma="Zomba")
+
+        reader = PdfReader(os.path.join(self.output, "bundle_0001.pdf"))
+        self.assertEqual(reader.outline[0].title, "ZOMBA")
+
+    def test_existing_bundles_are_not_bundled_again(self):
+        self.add("12345.pdf")
+        self.add("bundle_0001.pdf")
+
+        self.run_bundler()
+
+        self.assertEqual([b["files"] for b in self.manifest()["bundles"]], [["12345.pdf"]])
+
+    def test_output_folder_must_differ_from_input(self):
+        with self.assertRaises(ValueError):
+            bundler.main(self.verified, None, self.verified)
+
+    def test_dry_run_writes_nothing(self):
+        self.add("10000.pdf")
+
+        self.run_bundler(dry_run=True)
+
+        self.assertEqual(os.listdir(self.output), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
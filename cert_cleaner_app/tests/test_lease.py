@@ -0,0 +1,172 @@
+# Tests for lease
+import os
+import tempfile
+import threading
+import time
+import unittest
+from cert_cleaner.lease import LeaseManager, fingerprint
+
+TTL = 0.5
+HEARTBEAT = 0.1
+
+
+def crash(manager):
+    """Stops a node's heartbeat without releasing its leases, as if the PC died."""
+    manager._stop.set()
+    manager._thread.join()
+
+
+def claim_until(manager, key, seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if manager.claim(key):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestLeaseManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+        self.managers = []
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.close()
+        self.tmp.cleanup()
+
+    def node(self):
+        manager = LeaseManager(self.folder, ttl=TTL, heartbeat=HEARTBEAT)
+        self.managers.append(manager)
+        return manager
+
+    def test_claim_is_exclusive(self):
+        a, b = self.node(), self.node()
+
+        self.assertTrue(a.claim("merge-12345"))
+        self.assertFalse(b.claim("merge-12345"))
+        self.assertTrue(b.claim("merge-67890"))
+
+        a.release("merge-12345")
+        self.assertTrue(b.claim("merge-12345"))
+
+    def test_holds_notices_broken_lease(self):
+        a = self.node()
+        a.claim("merge-12345")
+        self.assertTrue(a.holds("merge-12345"))
+        self.assertFalse(a.holds("merge-67890"))
+
+        # Another node broke the lease and claimed it while this one stalled
+        with open(os.path.join(self.folder, "merge-12345.lease"), "w") as f:
+            f.write("other-node")
+
+        self.assertFalse(a.holds("merge-12345"))
+
+    def test_release_only_removes_own_lease(self):
+        a, b = self.node(), self.node()
+        a.claim("merge-12345")
+
+        b.release("merge-12345")
+
+        self.assertFalse(b.claim("merge-12345"))
+
+    def test_heartbeat_keeps_lease_alive(self):
+        a, b = self.node(), self.node()
+        a.claim("merge-12345")
+
+        self.assertFalse(claim_until(b, "merge-12345", TTL * 4))
+
+    def test_old_mtime_alone_does_not_expire_lease(self):
+        # A node whose clock is far ahead of the writer's sees an ancient mtime
+        a, b = self.node(), self.node()
+        a.claim("merge-12345")
+        crash(a)
+        os.utime(os.path.join(self.folder, "merge-12345.lease"), (0, 0))
+
+        self.assertFalse(b.claim("merge-12345"))
+
+    def test_expired_lease_is_broken_by_exactly_one_node(self):
+        a = self.node()
+        a.claim("merge-12345")
+        crash(a)
+
+        nodes = [self.node() for _ in range(4)]
+        wins = []
+
+        def contend(manager):
+            if claim_until(manager, "merge-12345", TTL * 6):
+                wins.append(manager.owner)
+
+        threads = [threading.Thread(target=contend, args=(n,)) for n in nodes]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(wins), 1)
+
+    def test_stale_break_file_is_cleaned_up(self):
+        a, b = self.node(), self.node()
+        a.claim("merge-12345")
+        crash(a)
+        # A node that died while breaking the lease leaves its break lock behind
+        break_path = os.path.join(self.folder, "merge-12345.break")
+        with open(break_path, "w") as f:
+            f.write("dead-node")
+
+        self.assertTrue(claim_until(b, "merge-12345", TTL * 8))
+        self.assertFalse(os.path.exists(break_path))
+
+    def test_claim_all_retries_keys_held_elsewhere(self):
+        a, b = self.node(), self.node()
+        a.claim("merge-12345")
+        threading.Timer(0.2, a.release, args=("merge-12345",)).start()
+
+        claimed = list(b.claim_all(["merge-12345", "merge-67890"], lambda key: True, poll=0.05))
+
+        self.assertEqual(claimed, ["merge-67890", "merge-12345"])
+
+    def test_claim_all_skips_keys_finished_elsewhere(self):
+        a, b = self.node(), self.node()
+        done = set()
+        a.claim("merge-12345")
+
+        def finish():
+            done.add("merge-12345")
+            a.release("merge-12345")
+        threading.Timer(0.2, finish).start()
+
+        claimed = list(b.claim_all(["merge-12345"], lambda key: key not in done, poll=0.05))
+
+        self.assertEqual(claimed, [])
+
+    def test_marker_matches_fingerprint(self):
+        a, b = self.node(), self.node()
+        source = os.path.join(self.tmp.name, "12345.pdf")
+        with open(source, "wb") as f:
+            f.write(b"mismatched")
+        a.claim("verify-12345.pdf")
+
+        a.mark("verify-12345.pdf", "mismatch", fingerprint(source))
+
+        self.assertEqual(b.marked("verify-12345.pdf", fingerprint(source)), "mismatch")
+        self.assertTrue(b.claim("verify-12345.pdf"))
+        with open(source, "wb") as f:
+            f.write(b"replaced by operator")
+        self.assertIsNone(b.marked("verify-12345.pdf", fingerprint(source)))
+        self.assertIsNone(b.marked("verify-67890.pdf", fingerprint(source)))
+
+    def test_close_releases_held_leases(self):
+        a = self.node()
+        a.claim("merge-12345")
+        a.claim("merge-67890")
+
+        a.close()
+
+        self.assertEqual(os.listdir(self.folder), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,155 @@
 # Tests for merger
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from pypdf import PdfReader, PdfWriter
+from cert_cleaner import merger
+
+
+def make_pdf(path, pages=1):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(100, 100)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def run_node(root, results):
+    logs = []
+    merger.main(os.path.join(root, "certs"), os.path.join(root, "plans"), os.path.join(root, "merged"),
+                log_callback=logs.append, lease_folder=os.path.join(root, "leases"))
+    results.put([line for line in logs if line.startswith(("Saved:", "Error"))])
+
+
+class TestMerger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.certs = os.path.join(self.root, "certs")
+        self.plans = os.path.join(self.root, "plans")
+        self.merged = os.path.join(self.root, "merged")
+        self.leases = os.path.join(self.root, "leases")
+        os.makedirs(self.certs)
+        os.makedirs(self.plans)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add_pair(self, upin, tlma="zomba"):
+        make_pdf(os.path.join(self.certs, f"{tlma}-{upin}.pdf"))
+        make_pdf(os.path.join(self.plans, f"{upin}.pdf"))
+
+    def run_merger(self, **kwargs):
+        logs = []
+        merger.main(self.certs, self.plans, self.merged, log_callback=logs.append, **kwargs)
+        return logs
+
+    def test_merges_pair_into_upin_named_file(self):
+        self.add_pair("12345")
+
+        self.run_merger()
+
+        self.assertEqual(os.listdir(self.merged), ["12345.pdf"])
+        self.assertEqual(len(PdfReader(os.path.join(self.merged, "12345.pdf")).pages), 2)
+        self.assertEqual(os.listdir(self.certs), [])
+        self.assertEqual(os.listdir(self.plans), [])
+
+    def test_duplicate_upins_are_reported_and_left_alone(self):
+        self.add_pair("12345", tlma="zomba")
+        make_pdf(os.path.join(self.certs, "blantyre-12345.pdf"))
+        self.add_pair("67890")
+
+        logs = self.run_merger(lease_folder=self.leases)
+
+        self.assertEqual(os.listdir(self.merged), ["67890.pdf"])
+        self.assertEqual(sorted(os.listdir(self.certs)), ["blantyre-12345.pdf", "zomba-12345.pdf"])
+        self.assertIn("Skipped (more than one cert for the same UPIN): 1", logs)
+        self.assertIn(" - 12345: blantyre-12345.pdf, zomba-12345.pdf", logs)
+
+    def test_lost_lease_leaves_sources_for_new_holder(self):
+        self.add_pair("12345")
+        real_reader = merger.PdfReader
+
+        def take_over(path):
+            # Another node breaks the lease while this one is still merging
+            with open(os.path.join(self.leases, "merge-12345.lease"), "w") as f:
+                f.write("other-node")
+            return real_reader(path)
+
+        with patch.object(merger, "PdfReader", side_effect=take_over):
+            logs = self.run_merger(lease_folder=self.leases)
+
+        self.assertIn("Lease for 12345 was taken over by another workstation; leaving source files", logs)
+        self.assertEqual(len(os.listdir(self.certs)), 1)
+        self.assertEqual(len(os.listdir(self.plans)), 1)
+        self.assertEqual(os.listdir(self.merged), ["12345.pdf"])
+
+    def test_dry_run_leaves_sources(self):
+        self.add_pair("12345")
+
+        self.run_merger(dry_run=True, lease_folder=self.leases)
+
+        self.assertEqual(os.listdir(self.merged), [])
+        self.assertEqual(len(os.listdir(self.certs)), 1)
+
+    def test_multiple_processes_merge_each_pair_exactly_once(self):
+        upins = [str(u) for u in range(10000, 10040)]
+        for upin in upins:
+            self.add_pair(upin)
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=run_node, args=(self.root, results)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        lines = [line for _ in procs for line in results.get(timeout=60)]
+        for p in procs:
+            p.join()
+
+        self.assertFalse([line for line in lines if line.startswith("Error")])
+        saved = sorted(os.path.basename(line.split(": ", 1)[1]) for line in lines)
+        self.assertEqual(saved, sorted(f"{upin}.pdf" for upin in upins))
+        self.assertEqual(len(os.listdir(self.merged)), len(upins))
+        self.assertEqual(os.listdir(self.certs), [])
+        self.assertEqual(os.listdir(self.leases), [])
+
+    def test_merge_error_is_retried_on_next_run(self):
+        self.add_pair("12345")
+        with open(os.path.join(self.plans, "12345.pdf"), "wb") as f:
+            f.write(b"not a pdf")
+
+        first = self.run_merger(lease_folder=self.leases)
+        second = self.run_merger(lease_folder=self.leases)
+
+        # A broken read may be transient, so no marker is left for other workstations
+        self.assertTrue(any(line.startswith("Error merging 12345") for line in first))
+        self.assertTrue(any(line.startswith("Error merging 12345") for line in second))
+        self.assertEqual(os.listdir(self.leases), [])
+
+        make_pdf(os.path.join(self.plans, "12345.pdf"))
+        self.run_merger(lease_folder=self.leases)
+        self.assertEqual(os.listdir(self.merged), ["12345.pdf"])
+
+    def test_undeleted_sources_count_as_merged_and_are_not_remerged(self):
+        self.add_pair("12345")
+        real_remove = os.remove
+
+        def locked_sources(path):
+            if os.path.dirname(path) == self.certs:
+                raise PermissionError("file in use")
+            real_remove(path)
+
+        with patch("cert_cleaner.merger.os.remove", side_effect=locked_sources):
+            first = self.run_merger(lease_folder=self.leases)
+        second = self.run_merger(lease_folder=self.leases)
+
+        self.assertIn("\nMerged: 1 pairs", first)
+        self.assertIn("Merged but source files not deleted: 1", first)
+        self.assertIn("\nMerged: 0 pairs", second)
+        self.assertIn("Skipped (merged earlier, source files not deleted): 1", second)
+        self.assertEqual(os.listdir(self.merged), ["12345.pdf"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,166 @@
 # Tests for verifier
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from cert_cleaner import verifier
+from cert_cleaner.budget import MemoryBudget
+
+
+class TestVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.merged = os.path.join(self.tmp.name, "merged")
+        self.ready = os.path.join(self.tmp.name, "ready")
+        self.leases = os.path.join(self.tmp.name, "leases")
+        os.makedirs(self.merged)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add(self, filename, content=b"%PDF-1.4"):
+        with open(os.path.join(self.merged, filename), "wb") as f:
+            f.write(content)
+
+    def run_verifier(self, upins, **kwargs):
+        """Runs the verifier with extract_upin returning upins[filename] = (cert UPIN, title UPIN)."""
+        def fake_extract(pdf_path, page_index, cert_upin=None):
+            return upins[os.path.basename(pdf_path)][page_index]
+
+        logs = []
+        with patch.object(verifier, "extract_upin", side_effect=fake_extract) as extract:
+            verifier.main(self.merged, None, self.ready, log_callback=logs.append, **kwargs)
+        return logs, extract.call_count
+
+    def test_verified_file_is_moved(self):
+        self.add("zomba-12345.pdf")
+
+        self.run_verifier({"zomba-12345.pdf": ("12345", "12345")}, lease_folder=self.leases)
+
+        self.assertEqual(os.listdir(self.ready), ["zomba-12345.pdf"])
+        self.assertEqual(os.listdir(self.merged), [])
+        self.assertEqual(os.listdir(self.leases), [])
+
+    def test_mismatch_is_not_rechecked_until_file_changes(self):
+        self.add("zomba-12345.pdf")
+        upins = {"zomba-12345.pdf": ("12345", "99999")}
+
+        _, first_calls = self.run_verifier(upins, lease_folder=self.leases)
+        logs, second_calls = self.run_verifier(upins, lease_folder=self.leases)
+
+        self.assertEqual(first_calls, 2)
+        self.assertEqual(second_calls, 0)
+        self.assertIn(" - zomba-12345.pdf", logs)
+
+        # A re-merged file is checked again
+        self.add("zomba-12345.pdf", b"%PDF-1.4 re-merged")
+        _, third_calls = self.run_verifier({"zomba-12345.pdf": ("12345", "12345")}, lease_folder=self.leases)
+        self.assertEqual(third_calls, 2)
+        self.assertEqual(os.listdir(self.ready), ["zomba-12345.pdf"])
+
+    def test_unreadable_file_is_retried_on_next_run(self):
+        self.add("zomba-12345.pdf")
+        upins = {"zomba-12345.pdf": ("12345", None)}
+
+        _, first_calls = self.run_verifier(upins, lease_folder=self.leases)
+        _, second_calls = self.run_verifier(upins, lease_folder=self.leases)
+
+        # OCR may be missing on one workstation only, so nothing is recorded
+        self.assertEqual(first_calls, 2)
+        self.assertEqual(second_calls, 2)
+        self.assertEqual(os.listdir(self.leases), [])
+
+    def test_lost_lease_leaves_merged_file_for_new_holder(self):
+        self.add("zomba-12345.pdf")
+        copies = []
+        real_copy = verifier.shutil.copy2
+
+        def take_over(pdf_path, page_index, cert_upin=None):
+            if page_index == 1:
+                with open(os.path.join(self.leases, "verify-zomba-12345.pdf.lease"), "w") as f:
+                    f.write("other-node")
+            return "12345"
+
+        def record_copy(src, dst):
+            copies.append(os.path.basename(dst))
+            return real_copy(src, dst)
+
+        logs = []
+        with patch.object(verifier, "extract_upin", side_effect=take_over), \
+                patch.object(verifier.shutil, "copy2", side_effect=record_copy):
+            verifier.main(self.merged, None, self.ready, log_callback=logs.append, lease_folder=self.leases)
+
+        self.assertEqual(os.listdir(self.merged), ["zomba-12345.pdf"])
+        self.assertIn("Lease for zomba-12345.pdf was taken over by another workstation; leaving source file", logs)
+        # The temporary copy is named after this node, not shared with the new holder
+        self.assertRegex(copies[0], r"^zomba-12345\.pdf\..+\.part$")
+        self.assertEqual(os.listdir(self.ready), ["zomba-12345.pdf"])
+
+    def test_file_removed_by_another_node_does_not_abort(self):
+        self.add("zomba-12345.pdf")
+        self.add("zomba-67890.pdf")
+        upins = {"zomba-12345.pdf": ("12345", "12345"), "zomba-67890.pdf": ("67890", "67890")}
+
+        def vanish(pdf_path, page_index, cert_upin=None):
+            # Simulate another workstation moving the file while we read it
+            if page_index == 1 and os.path.basename(pdf_path) == "zomba-12345.pdf":
+                os.remove(pdf_path)
+            return upins[os.path.basename(pdf_path)][page_index]
+
+        logs = []
+        with patch.object(verifier, "extract_upin", side_effect=vanish):
+            verifier.main(self.merged, None, self.ready, log_callback=logs.append)
+
+        self.assertIn("Skipped (already moved by another workstation): zomba-12345.pdf", logs)
+        self.assertEqual(os.listdir(self.ready), ["zomba-67890.pdf"])
+
+
+class TestTitlePlanOCR(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.budget = MemoryBudget(4 * 100, 100, os.path.join(self.tmp.name, "slots"))
+        patcher = patch.object(verifier, "ocr_budget", self.budget)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ocr_reads_rasterised_page_from_disk(self):
+        calls = {}
+
+        def fake_convert(pdf_path, **kwargs):
+            calls["convert"] = kwargs
+            image_path = os.path.join(kwargs["output_folder"], "page-2.png")
+            with open(image_path, "wb") as f:
+                f.write(b"png")
+            return [image_path]
+
+        def fake_tesseract(image):
+            calls["image"] = image
+            calls["existed"] = os.path.exists(image)
+            return "Title Plan No: 1234 / AB / 56789"
+
+        with patch.object(verifier, "convert_from_path", side_effect=fake_convert), \
+                patch.object(verifier.pytesseract, "image_to_string", side_effect=fake_tesseract):
+            upin = verifier.extract_upin_titleplan_ocr("merged.pdf")
+
+        self.assertEqual(upin, "56789")
+        self.assertTrue(calls["convert"]["paths_only"])
+        self.assertEqual(calls["convert"]["first_page"], 2)
+        self.assertIsInstance(calls["image"], str)
+        self.assertTrue(calls["existed"])
+        self.assertFalse(os.path.exists(calls["convert"]["output_folder"]))
+        self.assertEqual(len(self.budget._try_acquire(self.budget.slots)), self.budget.slots)
+
+    def test_budget_released_when_rasterisation_fails(self):
+        with patch.object(verifier, "convert_from_path", side_effect=RuntimeError("poppler missing")):
+            self.assertIsNone(verifier.extract_upin_titleplan_ocr("merged.pdf"))
+
+        self.assertEqual(len(self.budget._try_acquire(self.budget.slots)), self.budget.slots)
+
+
+if __name__ == '__main__':
+    unittest.main()